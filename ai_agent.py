@@ -4,64 +4,194 @@ Generates human-like responses to engage scammers
 """
 
 import random
-from typing import List, Dict, Any
+import re
+from typing import List, Any, Mapping, Optional, Tuple
 from models import Message
 from intelligence_extractor import IntelligenceExtractor
 
 
+# Shared RNG. Sampling via one C-level random() call is cheaper than
+# random.choice(), whose _randbelow() rejection loop runs in Python.
+_random = random.Random().random
+
+
+def _choice(pool: Tuple[str, ...]) -> str:
+    """Pick a response uniformly from a non-empty pool"""
+    return pool[int(_random() * len(pool))]
+
+
+_WORD_RE = re.compile(r"\w+")
+
+# Response strategies based on scam type and conversation stage
+_CONFUSED_RESPONSES = (
+    "I don't understand. What do you mean?",
+    "Can you explain that again?",
+    "I'm not sure what you're asking for.",
+    "This is confusing. Can you clarify?",
+    "Sorry, I didn't get that. Could you repeat?"
+)
+
+_CONCERNED_RESPONSES = (
+    "Oh no! Is this serious?",
+    "This sounds urgent. What should I do?",
+    "I'm worried now. Can you help me?",
+    "Is my account really in danger?",
+    "Should I be concerned about this?"
+)
+
+_COMPLIANCE_STARTERS = (
+    "Okay, I want to help.",
+    "I'll do what you say.",
+    "Please tell me what to do.",
+    "I don't want any problems.",
+    "How can I fix this?"
+)
+
+_INFO_GATHERING = (
+    "Can you tell me more about this?",
+    "What exactly happened?",
+    "Who are you with?",
+    "How did you get my number?",
+    "Is this from my bank?"
+)
+
+_TECHNICAL_DIFFICULTIES = (
+    "The link isn't working. Can you send another?",
+    "I'm having trouble with the website.",
+    "My internet is slow. Can you wait?",
+    "I can't open that link. Do you have another way?",
+    "The page won't load. What should I do?"
+)
+
+_DELAY_TACTICS = (
+    "Let me check my account first.",
+    "Give me a moment, I need to find my phone.",
+    "I'm at work right now. Can I do this later?",
+    "I need to talk to my son/daughter about this.",
+    "Can you call back in 10 minutes?"
+)
+
+# Ask about their organization
+_EXTRACTION_RESPONSES = (
+    "What's the name of your company again?",
+    "Can you give me your employee ID number?",
+    "What department are you from?",
+    "Do you have an office I can visit?",
+    "Can I get a reference number for this case?",
+    "Who is your supervisor? I'd like to speak with them.",
+    "What's your callback number?",
+    "Is there an email address I can contact?",
+    "Can you send me this in writing?",
+    "Do you have any official documentation?"
+)
+
+_FINAL_MESSAGES = (
+    "I need to think about this. Let me call you back.",
+    "My son just told me this might be a scam. I'm not comfortable continuing.",
+    "I'm going to visit my bank branch instead.",
+    "This doesn't feel right. I'm going to hang up now.",
+    "I'll handle this later. Thank you."
+)
+
+# Stage keyword -> response category, with categories checked in order
+_STAGE1_KEYWORDS = {
+    "bank": "bank", "banks": "bank", "banking": "bank",
+    "account": "bank", "accounts": "bank",
+    "urgent": "urgency", "urgently": "urgency",
+    "immediately": "urgency", "now": "urgency",
+    "verify": "verify", "verification": "verify",
+    "confirm": "verify", "confirmation": "verify",
+    "update": "verify", "updated": "verify"
+}
+
+_STAGE1_RESPONSES = {
+    # Ask who they are
+    "bank": (
+        "Who is this? Which bank are you calling from?",
+        "Is this really my bank? How do I know?",
+        "I didn't expect a call. What's this about?"
+    ),
+    # Express confusion about urgency
+    "urgency": (
+        "Why is this so urgent? What happened?",
+        "I don't understand. Why do I need to do this now?",
+        "Can you explain why this can't wait?"
+    ),
+    # Question verification requests
+    "verify": (
+        "Why do you need me to verify? I didn't request anything.",
+        "How do I know this is legitimate?",
+        "Can I verify this through the official website instead?"
+    )
+}
+
+_STAGE2_KEYWORDS = {
+    "suspend": "threat", "suspended": "threat", "suspension": "threat",
+    "block": "threat", "blocked": "threat",
+    "legal": "threat", "arrest": "threat", "arrested": "threat",
+    "won": "reward", "prize": "reward", "prizes": "reward",
+    "reward": "reward", "rewards": "reward", "congratulations": "reward",
+    "pay": "payment", "payment": "payment", "money": "payment",
+    "transfer": "payment", "upi": "payment"
+}
+
+_STAGE2_RESPONSES = {
+    # Show concern about threats
+    "threat": (
+        "Oh no! What did I do wrong?",
+        "This is scary. Can you tell me what's happening?",
+        "I don't want any legal trouble. Please explain."
+    ),
+    # Ask about rewards/prizes
+    "reward": (
+        "Really? I won something? What is it?",
+        "How did I win? I don't remember entering anything.",
+        "This sounds too good to be true. Is it real?"
+    ),
+    # Question about money/payment
+    "payment": (
+        "How much money are we talking about?",
+        "Why do I need to pay? For what?",
+        "Can you explain the charges to me?"
+    )
+}
+
+_STAGE3_KEYWORDS = {
+    "link": "link", "links": "link", "http": "link", "https": "link",
+    "otp": "personal_info", "password": "personal_info",
+    "cvv": "personal_info", "pin": "personal_info",
+    "install": "install", "download": "install", "app": "install",
+    "anydesk": "install", "teamviewer": "install"
+}
+
+_STAGE3_RESPONSES = {
+    # If asked to click link
+    "link": (
+        "I'm trying to click but nothing is happening.",
+        "The link takes me to a weird page. Is this right?",
+        "My phone says this site might not be secure. Should I continue?",
+        "Can you send the official website link instead?"
+    ),
+    # If asked for personal info
+    "personal_info": (
+        "Let me get my card. One moment.",
+        "I need to find where I wrote that down.",
+        "Is it safe to share this over the phone?",
+        "My son told me never to share this. Are you sure it's okay?"
+    ),
+    # If asked to install app/software
+    "install": (
+        "I'm not very good with technology. Can you help me?",
+        "My phone is asking for permissions. What should I allow?",
+        "This is taking forever to download. Is that normal?",
+        "I don't see that app in the Play Store. Where is it?"
+    )
+}
+
+
 class HoneypotAgent:
     """AI agent that engages scammers with human-like responses"""
     
-    def __init__(self):
-        # Response strategies based on scam type and conversation stage
-        self.confused_responses = [
-            "I don't understand. What do you mean?",
-            "Can you explain that again?",
-            "I'm not sure what you're asking for.",
-            "This is confusing. Can you clarify?",
-            "Sorry, I didn't get that. Could you repeat?"
-        ]
-        
-        self.concerned_responses = [
-            "Oh no! Is this serious?",
-            "This sounds urgent. What should I do?",
-            "I'm worried now. Can you help me?",
-            "Is my account really in danger?",
-            "Should I be concerned about this?"
-        ]
-        
-        self.compliance_starters = [
-            "Okay, I want to help.",
-            "I'll do what you say.",
-            "Please tell me what to do.",
-            "I don't want any problems.",
-            "How can I fix this?"
-        ]
-        
-        self.info_gathering = [
-            "Can you tell me more about this?",
-            "What exactly happened?",
-            "Who are you with?",
-            "How did you get my number?",
-            "Is this from my bank?"
-        ]
-        
-        self.technical_difficulties = [
-            "The link isn't working. Can you send another?",
-            "I'm having trouble with the website.",
-            "My internet is slow. Can you wait?",
-            "I can't open that link. Do you have another way?",
-            "The page won't load. What should I do?"
-        ]
-        
-        self.delay_tactics = [
-            "Let me check my account first.",
-            "Give me a moment, I need to find my phone.",
-            "I'm at work right now. Can I do this later?",
-            "I need to talk to my son/daughter about this.",
-            "Can you call back in 10 minutes?"
-        ]
-    
     def generate_response(
         self,
         scammer_message: str,
@@ -99,34 +229,32 @@ class HoneypotAgent:
         else:
             return self._generate_extraction_response(scammer_message, message_lower)
     
-    def _generate_initial_response(self, message: str, message_lower: str) -> str:
-        """Generate initial confused/questioning response"""
-        
-        # Ask who they are
-        if any(word in message_lower for word in ["bank", "account"]):
-            return random.choice([
-                "Who is this? Which bank are you calling from?",
-                "Is this really my bank? How do I know?",
-                "I didn't expect a call. What's this about?"
-            ])
+    def _match_category(
+        self,
+        message_lower: str,
+        keywords: Mapping[str, str],
+        responses: Mapping[str, Tuple[str, ...]]
+    ) -> Optional[str]:
+        """Return the highest-priority response category hit by the message"""
+        categories = {
+            keywords[token]
+            for token in _WORD_RE.findall(message_lower)
+            if token in keywords
+        }
         
-        # Express confusion about urgency
-        if any(word in message_lower for word in ["urgent", "immediately", "now"]):
-            return random.choice([
-                "Why is this so urgent? What happened?",
-                "I don't understand. Why do I need to do this now?",
-                "Can you explain why this can't wait?"
-            ])
+        for category in responses:
+            if category in categories:
+                return category
         
-        # Question verification requests
-        if any(word in message_lower for word in ["verify", "confirm", "update"]):
-            return random.choice([
-                "Why do you need me to verify? I didn't request anything.",
-                "How do I know this is legitimate?",
-                "Can I verify this through the official website instead?"
-            ])
+        return None
+    
+    def _generate_initial_response(self, message: str, message_lower: str) -> str:
+        """Generate initial confused/questioning response"""
+        category = self._match_category(message_lower, _STAGE1_KEYWORDS, _STAGE1_RESPONSES)
+        if category:
+            return _choice(_STAGE1_RESPONSES[category])
         
-        return random.choice(self.confused_responses)
+        return _choice(_CONFUSED_RESPONSES)
     
     def _generate_concerned_response(
         self,
@@ -135,85 +263,25 @@ class HoneypotAgent:
         scam_indicators: List[str]
     ) -> str:
         """Generate concerned response with information gathering"""
-        
-        # Show concern about threats
-        if any(word in message_lower for word in ["suspend", "block", "legal", "arrest"]):
-            return random.choice([
-                "Oh no! What did I do wrong?",
-                "This is scary. Can you tell me what's happening?",
-                "I don't want any legal trouble. Please explain."
-            ])
-        
-        # Ask about rewards/prizes
-        if any(word in message_lower for word in ["won", "prize", "reward", "congratulations"]):
-            return random.choice([
-                "Really? I won something? What is it?",
-                "How did I win? I don't remember entering anything.",
-                "This sounds too good to be true. Is it real?"
-            ])
-        
-        # Question about money/payment
-        if any(word in message_lower for word in ["pay", "money", "transfer", "upi"]):
-            return random.choice([
-                "How much money are we talking about?",
-                "Why do I need to pay? For what?",
-                "Can you explain the charges to me?"
-            ])
+        category = self._match_category(message_lower, _STAGE2_KEYWORDS, _STAGE2_RESPONSES)
+        if category:
+            return _choice(_STAGE2_RESPONSES[category])
         
         # Ask for more details
-        return random.choice(self.info_gathering)
+        return _choice(_INFO_GATHERING)
     
     def _generate_compliant_response(self, message: str, message_lower: str) -> str:
         """Generate seemingly compliant response with delays"""
-        
-        # If asked to click link
-        if "link" in message_lower or "http" in message:
-            return random.choice([
-                "I'm trying to click but nothing is happening.",
-                "The link takes me to a weird page. Is this right?",
-                "My phone says this site might not be secure. Should I continue?",
-                "Can you send the official website link instead?"
-            ])
-        
-        # If asked for personal info
-        if any(word in message_lower for word in ["otp", "password", "cvv", "pin"]):
-            return random.choice([
-                "Let me get my card. One moment.",
-                "I need to find where I wrote that down.",
-                "Is it safe to share this over the phone?",
-                "My son told me never to share this. Are you sure it's okay?"
-            ])
-        
-        # If asked to install app/software
-        if any(word in message_lower for word in ["install", "download", "app", "anydesk", "teamviewer"]):
-            return random.choice([
-                "I'm not very good with technology. Can you help me?",
-                "My phone is asking for permissions. What should I allow?",
-                "This is taking forever to download. Is that normal?",
-                "I don't see that app in the Play Store. Where is it?"
-            ])
+        category = self._match_category(message_lower, _STAGE3_KEYWORDS, _STAGE3_RESPONSES)
+        if category:
+            return _choice(_STAGE3_RESPONSES[category])
         
         # General delay
-        return random.choice(self.delay_tactics)
+        return _choice(_DELAY_TACTICS)
     
     def _generate_extraction_response(self, message: str, message_lower: str) -> str:
         """Generate response to extract more information"""
-        
-        # Ask about their organization
-        responses = [
-            "What's the name of your company again?",
-            "Can you give me your employee ID number?",
-            "What department are you from?",
-            "Do you have an office I can visit?",
-            "Can I get a reference number for this case?",
-            "Who is your supervisor? I'd like to speak with them.",
-            "What's your callback number?",
-            "Is there an email address I can contact?",
-            "Can you send me this in writing?",
-            "Do you have any official documentation?"
-        ]
-        
-        return random.choice(responses)
+        return _choice(_EXTRACTION_RESPONSES)
     
     def should_end_conversation(
         self,
@@ -224,35 +292,25 @@ class HoneypotAgent:
         Determine if conversation should end
         
         Ends when:
-        - Sufficient intelligence gathered
-        - Too many exchanges (>15)
-        - Scammer gives up
+        - 15+ exchanges and actionable intelligence gathered
+        - 20 exchanges reached, regardless of intelligence
         """
         
-        # End after 15-20 exchanges
-        if engagement_count >= 15:
-            # Check if we have good intelligence
-            has_intelligence = (
-                len(intelligence.phone_numbers) > 0 or
-                len(intelligence.upi_ids) > 0 or
-                len(intelligence.phishing_links) > 0 or
-                len(intelligence.bank_accounts) > 0
-            )
-            
-            return True
-        
         # End after 20 no matter what
         if engagement_count >= 20:
             return True
         
+        # End after 15 once we have good intelligence
+        if engagement_count >= 15:
+            return bool(
+                intelligence.phone_numbers or
+                intelligence.upi_ids or
+                intelligence.phishing_links or
+                intelligence.bank_accounts
+            )
+        
         return False
     
     def generate_final_message(self) -> str:
         """Generate final message before ending conversation"""
-        return random.choice([
-            "I need to think about this. Let me call you back.",
-            "My son just told me this might be a scam. I'm not comfortable continuing.",
-            "I'm going to visit my bank branch instead.",
-            "This doesn't feel right. I'm going to hang up now.",
-            "I'll handle this later. Thank you."
-        ])
+        return _choice(_FINAL_MESSAGES)
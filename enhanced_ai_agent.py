@@ -6,12 +6,19 @@ To use this, you need an Anthropic API key.
 Set it in your .env file: ANTHROPIC_API_KEY=your-key-here
 """
 
+import json
 import os
-from typing import List, Dict
+from typing import Any, List, Dict
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
 from models import Message
 from ai_agent import HoneypotAgent
 
 
+CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
+
+
 class EnhancedHoneypotAgent(HoneypotAgent):
     """
     Enhanced agent that can optionally use Claude API for more sophisticated responses
@@ -26,6 +33,20 @@ class EnhancedHoneypotAgent(HoneypotAgent):
         if self.use_claude_api and not self.anthropic_api_key:
             print("Warning: Claude API requested but ANTHROPIC_API_KEY not found. Using rule-based responses.")
             self.use_claude_api = False
+        
+        headers = {
+            "x-api-key": self.anthropic_api_key or "",
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+        
+        # Reuse one keep-alive connection for every Claude call in the conversation
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._session.headers.update(headers)
+        
+        # Async client for callers running inside an event loop
+        self._aclient = httpx.AsyncClient(headers=headers, timeout=10)
     
     def generate_response(
         self,
@@ -64,6 +85,37 @@ class EnhancedHoneypotAgent(HoneypotAgent):
                 engagement_count
             )
     
+    async def generate_response_async(
+        self,
+        scammer_message: str,
+        conversation_history: List[Message],
+        scam_indicators: List[str],
+        engagement_count: int
+    ) -> str:
+        """
+        Async variant of generate_response that streams the Claude reply
+        without blocking the event loop
+        """
+        
+        if self.use_claude_api:
+            try:
+                return await self._generate_claude_response_async(
+                    scammer_message,
+                    conversation_history,
+                    scam_indicators,
+                    engagement_count
+                )
+            except Exception as e:
+                print(f"Claude API error: {e}. Falling back to rule-based responses.")
+        
+        # Use rule-based responses
+        return super().generate_response(
+            scammer_message,
+            conversation_history,
+            scam_indicators,
+            engagement_count
+        )
+    
     def _generate_claude_response(
         self,
         scammer_message: str,
@@ -74,16 +126,91 @@ class EnhancedHoneypotAgent(HoneypotAgent):
         """
         Generate response using Claude API
         """
-        import requests
+        prompt = self._build_prompt(
+            scammer_message,
+            conversation_history,
+            scam_indicators,
+            engagement_count
+        )
+        
+        # Call Claude API
+        response = self._session.post(
+            CLAUDE_API_URL,
+            json=self._build_request_body(prompt),
+            timeout=10
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            return self._clean_reply(data["content"][0]["text"])
+        else:
+            raise Exception(f"API error: {response.status_code}")
+    
+    async def _generate_claude_response_async(
+        self,
+        scammer_message: str,
+        conversation_history: List[Message],
+        scam_indicators: List[str],
+        engagement_count: int
+    ) -> str:
+        """
+        Generate response using the streaming Claude API
+        """
+        prompt = self._build_prompt(
+            scammer_message,
+            conversation_history,
+            scam_indicators,
+            engagement_count
+        )
+        
+        # Accumulate text deltas from the server-sent event stream
+        chunks = []
+        async with self._aclient.stream(
+            "POST",
+            CLAUDE_API_URL,
+            json=self._build_request_body(prompt, stream=True)
+        ) as response:
+            if response.status_code != 200:
+                raise Exception(f"API error: {response.status_code}")
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                
+                event = json.loads(line[len("data:"):])
+                event_type = event.get("type")
+                if event_type == "content_block_delta":
+                    chunks.append(event["delta"].get("text", ""))
+                elif event_type == "error":
+                    error = event.get("error", {})
+                    raise Exception(f"API stream error: {error.get('type')} - {error.get('message')}")
+        
+        agent_reply = self._clean_reply("".join(chunks))
+        if not agent_reply:
+            raise Exception("API stream returned no text")
         
+        return agent_reply
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP clients"""
+        self._session.close()
+        await self._aclient.aclose()
+    
+    def _build_prompt(
+        self,
+        scammer_message: str,
+        conversation_history: List[Message],
+        scam_indicators: List[str],
+        engagement_count: int
+    ) -> str:
+        """Build the roleplay prompt for the current conversation stage"""
         # Build conversation context
         context = self._build_context(conversation_history)
         
         # Determine persona based on stage
         persona = self._get_persona_for_stage(engagement_count)
         
-        # Build prompt
-        prompt = f"""You are roleplaying as a potential scam victim in a honeypot scenario. Your goal is to:
+        return f"""You are roleplaying as a potential scam victim in a honeypot scenario. Your goal is to:
 1. Maintain a believable human persona
 2. Keep the scammer engaged without revealing you've detected the scam
 3. Extract information from the scammer
@@ -106,36 +233,29 @@ Generate a response that:
 - Does NOT reveal you know this is a scam
 
 Your response:"""
-
-        # Call Claude API
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": self.anthropic_api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            },
-            json={
-                "model": "claude-3-5-sonnet-20241022",
-                "max_tokens": 150,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
-            },
-            timeout=10
-        )
+    
+    def _build_request_body(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        """Build the Messages API request body"""
+        body = {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 150,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if stream:
+            body["stream"] = True
+        return body
+    
+    def _clean_reply(self, agent_reply: str) -> str:
+        """Strip whitespace and surrounding quotes from a generated reply"""
+        agent_reply = agent_reply.strip()
         
-        if response.status_code == 200:
-            data = response.json()
-            agent_reply = data["content"][0]["text"].strip()
-            
-            # Remove quotes if present
-            if agent_reply.startswith('"') and agent_reply.endswith('"'):
-                agent_reply = agent_reply[1:-1]
-            
-            return agent_reply
-        else:
-            raise Exception(f"API error: {response.status_code}")
+        # Remove quotes if present
+        if agent_reply.startswith('"') and agent_reply.endswith('"'):
+            agent_reply = agent_reply[1:-1]
+        
+        return agent_reply
     
     def _build_context(self, conversation_history: List[Message]) -> str:
         """Build conversation context string"""
@@ -181,3 +301,4 @@ Your response:"""
 # Example usage in main.py:
 # from enhanced_ai_agent import EnhancedHoneypotAgent
 # honeypot_agent = EnhancedHoneypotAgent(use_claude_api=True)
+# agent_reply = await honeypot_agent.generate_response_async(...)
@@ -4,40 +4,157 @@ Extracts and stores scam-related intelligence from conversations
 """
 
 import re
-from typing import List, Set, Dict
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import List, Set, Dict, Iterable, Optional, Tuple
 from urllib.parse import urlparse
 
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional speedup
+    ahocorasick = None
+
+
+def _build_automaton(words: Iterable[str]):
+    """Build an Aho-Corasick automaton over words, or None if unavailable"""
+    if ahocorasick is None:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+@dataclass(frozen=True)
+class IntelligenceSummary:
+    """Snapshot of collected intelligence; lists are shared, not copied"""
+    __slots__ = (
+        "bank_accounts", "upi_ids", "phishing_links",
+        "phone_numbers", "suspicious_keywords", "total_indicators"
+    )
+    
+    bank_accounts: List[str]
+    upi_ids: List[str]
+    phishing_links: List[str]
+    phone_numbers: List[str]
+    suspicious_keywords: List[str]
+    total_indicators: int
+
 
 class IntelligenceExtractor:
     """Extracts actionable intelligence from scam conversations"""
     
+    # Read-only tables shared by every extractor; only the collected
+    # intelligence below lives on the instance
+    
+    # Patterns for extraction
+    patterns = {
+        name: re.compile(source, re.IGNORECASE)
+        for name, source in {
+            "phone": r'\+?\d[\d\s\-\(\)]{8,}\d',
+            "upi": r'[\w\.\-]+@[\w]+',
+            "url": r'https?://[^\s]+|www\.[^\s]+',
+            "bank_account": r'\b\d{9,18}\b',
+            "ifsc": r'\b[A-Z]{4}0[A-Z0-9]{6}\b',
+            "card": r'\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b'
+        }.items()
+    }
+    
+    _WORD_RE = re.compile(r'\w+')
+    _DIGIT_RE = re.compile(r'\d')
+    _IP_RE = re.compile(r'^\d+\.\d+\.\d+\.\d+$')
+    
+    # Deletes every separator the phone pattern allows: "-", "(", ")" and
+    # all whitespace \s can match (U+3000 is the highest such code point)
+    _PHONE_DELETE = str.maketrans('', '', '-()' + ''.join(
+        char for char in map(chr, range(0x3001)) if char.isspace()
+    ))
+    
+    # Joins batched messages: "\n" ends URL matches and "\x00" ends phone,
+    # UPI and account matches, so no match spans two messages
+    _BATCH_SEPARATOR = "\n\x00"
+    
+    # Known scam keywords to track
+    scam_keywords = (
+        "verify now", "urgent action", "account blocked", "suspended",
+        "click here", "limited time", "act now", "confirm immediately",
+        "prize", "winner", "congratulations", "reward",
+        "refund pending", "cashback", "bonus",
+        "legal action", "arrest warrant", "court notice",
+        "suspicious activity", "unauthorized access",
+        "update kyc", "re-kyc", "pan update", "aadhaar update"
+    )
+    
+    # Single-pass multi-keyword matcher (falls back to substring scans)
+    _keyword_automaton = _build_automaton(scam_keywords)
+    
+    # URL heuristics
+    _SUSPICIOUS_TLDS = frozenset(('.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top'))
+    _SUSPICIOUS_DOMAIN_WORDS = (
+        'verify', 'secure', 'account', 'update', 'confirm', 'banking'
+    )
+    _domain_automaton = _build_automaton(_SUSPICIOUS_DOMAIN_WORDS)
+    
+    # Scam type -> trigger words, checked in order against collected keywords
+    _SCAM_TYPE_RULES = (
+        ("Prize/Lottery Scam", frozenset({"prize", "winner", "won", "lottery"})),
+        ("Bank Account Scam", frozenset({"bank", "account", "blocked", "suspended"})),
+        ("KYC/Verification Scam", frozenset({"kyc", "update", "verify"})),
+        ("Refund Scam", frozenset({"refund", "cashback"})),
+        ("Threat/Extortion Scam", frozenset({"legal", "arrest", "court"})),
+    )
+    
     def __init__(self):
+        # Patterns and automata are shared class attributes, so a new
+        # per-session extractor only allocates these empty containers
         self.bank_accounts: List[str] = []
         self.upi_ids: List[str] = []
         self.phishing_links: List[str] = []
         self.phone_numbers: List[str] = []
         self.suspicious_keywords: List[str] = []
         
-        # Patterns for extraction
-        self.patterns = {
-            "phone": r'\+?\d[\d\s\-\(\)]{8,}\d',
-            "upi": r'[\w\.\-]+@[\w]+',
-            "url": r'https?://[^\s]+|www\.[^\s]+',
-            "bank_account": r'\b\d{9,18}\b',
-            "ifsc": r'\b[A-Z]{4}0[A-Z0-9]{6}\b',
-            "card": r'\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b'
+        # Membership sets mirroring the ordered lists above
+        self._bank_set: Set[str] = set()
+        self._upi_set: Set[str] = set()
+        self._link_set: Set[str] = set()
+        self._phone_set: Set[str] = set()
+        self._keyword_set: Set[str] = set()
+        self._keyword_words: Set[str] = set()
+        
+        # Running indicator count and cached summary, refreshed on insertion
+        self._total = 0
+        self._summary: Optional[IntelligenceSummary] = None
+    
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Collected intelligence as plain lists (for JSON storage)"""
+        return {
+            "bank_accounts": self.bank_accounts,
+            "upi_ids": self.upi_ids,
+            "phishing_links": self.phishing_links,
+            "phone_numbers": self.phone_numbers,
+            "suspicious_keywords": self.suspicious_keywords
         }
-        
-        # Known scam keywords to track
-        self.scam_keywords = [
-            "verify now", "urgent action", "account blocked", "suspended",
-            "click here", "limited time", "act now", "confirm immediately",
-            "prize", "winner", "congratulations", "reward",
-            "refund pending", "cashback", "bonus",
-            "legal action", "arrest warrant", "court notice",
-            "suspicious activity", "unauthorized access",
-            "update kyc", "re-kyc", "pan update", "aadhaar update"
-        ]
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[str]]) -> "IntelligenceExtractor":
+        """Rebuild an extractor from the lists returned by to_dict"""
+        extractor = cls()
+        extracted = extractor._new_extraction()
+        
+        for account in data.get("bank_accounts", []):
+            extractor._record(account, extractor._bank_set, extractor.bank_accounts, extracted["bank_accounts"])
+        for upi in data.get("upi_ids", []):
+            extractor._record(upi, extractor._upi_set, extractor.upi_ids, extracted["upi_ids"])
+        for url in data.get("phishing_links", []):
+            extractor._record(url, extractor._link_set, extractor.phishing_links, extracted["urls"])
+        for phone in data.get("phone_numbers", []):
+            extractor._record(phone, extractor._phone_set, extractor.phone_numbers, extracted["phone_numbers"])
+        for keyword in data.get("suspicious_keywords", []):
+            extractor._record_keyword(keyword, extracted)
+        
+        return extractor
     
     def extract_from_message(self, message: str) -> Dict[str, List[str]]:
         """
@@ -49,91 +166,187 @@ class IntelligenceExtractor:
         Returns:
             Dictionary of extracted items
         """
-        extracted = {
-            "phone_numbers": [],
-            "upi_ids": [],
-            "urls": [],
-            "bank_accounts": [],
-            "keywords": []
-        }
+        extracted = self._new_extraction()
+        
+        message_lower = message.lower()
+        
+        # Phone and account numbers need digits; most chat turns have none
+        has_digit = self._DIGIT_RE.search(message) is not None
         
         # Extract phone numbers
-        phones = self._extract_pattern(message, "phone")
-        for phone in phones:
-            cleaned_phone = self._clean_phone_number(phone)
-            if cleaned_phone and cleaned_phone not in self.phone_numbers:
-                self.phone_numbers.append(cleaned_phone)
-                extracted["phone_numbers"].append(cleaned_phone)
+        if has_digit:
+            phones = self._extract_pattern(message, "phone")
+            for phone in phones:
+                self._record_phone(phone, extracted)
         
         # Extract UPI IDs
         upis = self._extract_pattern(message, "upi")
         for upi in upis:
-            if upi not in self.upi_ids and "@" in upi:
-                self.upi_ids.append(upi)
-                extracted["upi_ids"].append(upi)
+            self._record(upi, self._upi_set, self.upi_ids, extracted["upi_ids"])
         
-        # Extract URLs
-        urls = self._extract_pattern(message, "url")
-        for url in urls:
-            if url not in self.phishing_links:
-                self.phishing_links.append(url)
-                extracted["urls"].append(url)
+        # Extract URLs (every match contains "://" or "www.")
+        if "://" in message or "www." in message_lower:
+            urls = self._extract_pattern(message, "url")
+            for url in urls:
+                self._record(url, self._link_set, self.phishing_links, extracted["urls"])
         
         # Extract bank accounts
-        accounts = self._extract_pattern(message, "bank_account")
-        for account in accounts:
-            if account not in self.bank_accounts and len(account) >= 9:
-                self.bank_accounts.append(account)
-                extracted["bank_accounts"].append(account)
+        if has_digit:
+            accounts = self._extract_pattern(message, "bank_account")
+            for account in accounts:
+                self._record(account, self._bank_set, self.bank_accounts, extracted["bank_accounts"])
         
         # Extract suspicious keywords
-        message_lower = message.lower()
-        for keyword in self.scam_keywords:
-            if keyword in message_lower and keyword not in self.suspicious_keywords:
-                self.suspicious_keywords.append(keyword)
-                extracted["keywords"].append(keyword)
+        for keyword in self._match_keywords(message_lower):
+            self._record_keyword(keyword, extracted)
         
         return extracted
     
+    def extract_from_messages(self, messages: List[str]) -> List[Dict[str, List[str]]]:
+        """
+        Extract all intelligence from a batch of messages
+        
+        Each pattern scans the whole batch once and matches are attributed
+        back to their source message by offset. The result is the same as
+        calling extract_from_message on each message in order.
+        
+        Args:
+            messages: Message texts to analyze, oldest first
+        
+        Returns:
+            Dictionary of extracted items for each message
+        """
+        results = [self._new_extraction() for _ in messages]
+        if not messages:
+            return results
+        
+        # Lowercasing may change string lengths, so it gets its own offsets
+        joined, starts = self._join_batch(messages)
+        lowered = [message.lower() for message in messages]
+        joined_lower, lower_starts = self._join_batch(lowered)
+        
+        def owner(offsets: List[int], position: int) -> Dict[str, List[str]]:
+            return results[bisect_right(offsets, position) - 1]
+        
+        has_digit = self._DIGIT_RE.search(joined) is not None
+        
+        # Extract phone numbers
+        if has_digit:
+            for match in self.patterns["phone"].finditer(joined):
+                self._record_phone(match.group(), owner(starts, match.start()))
+        
+        # Extract UPI IDs
+        for match in self.patterns["upi"].finditer(joined):
+            extracted = owner(starts, match.start())
+            self._record(match.group(), self._upi_set, self.upi_ids, extracted["upi_ids"])
+        
+        # Extract URLs
+        if "://" in joined or "www." in joined_lower:
+            for match in self.patterns["url"].finditer(joined):
+                extracted = owner(starts, match.start())
+                self._record(match.group(), self._link_set, self.phishing_links, extracted["urls"])
+        
+        # Extract bank accounts
+        if has_digit:
+            for match in self.patterns["bank_account"].finditer(joined):
+                extracted = owner(starts, match.start())
+                self._record(match.group(), self._bank_set, self.bank_accounts, extracted["bank_accounts"])
+        
+        # Extract suspicious keywords
+        if self._keyword_automaton is not None:
+            for end, keyword in self._keyword_automaton.iter(joined_lower):
+                self._record_keyword(keyword, owner(lower_starts, end - len(keyword) + 1))
+        else:
+            for message_lower, extracted in zip(lowered, results):
+                for keyword in self._match_keywords(message_lower):
+                    self._record_keyword(keyword, extracted)
+        
+        return results
+    
+    def _join_batch(self, messages: List[str]) -> Tuple[str, List[int]]:
+        """Join messages with a separator no pattern can match across"""
+        starts = []
+        offset = 0
+        for message in messages:
+            starts.append(offset)
+            offset += len(message) + len(self._BATCH_SEPARATOR)
+        
+        return self._BATCH_SEPARATOR.join(messages), starts
+    
+    def _new_extraction(self) -> Dict[str, List[str]]:
+        """Empty per-message extraction result"""
+        return {
+            "phone_numbers": [],
+            "upi_ids": [],
+            "urls": [],
+            "bank_accounts": [],
+            "keywords": []
+        }
+    
+    def _record(
+        self,
+        item: str,
+        seen: Set[str],
+        collected: List[str],
+        extracted: List[str]
+    ) -> None:
+        """Store an item if it has not been collected yet"""
+        if item not in seen:
+            seen.add(item)
+            collected.append(item)
+            extracted.append(item)
+            self._total += 1
+            self._summary = None
+    
+    def _record_phone(self, phone: str, extracted: Dict[str, List[str]]) -> None:
+        """Clean and store a phone number candidate"""
+        cleaned_phone = self._clean_phone_number(phone)
+        if cleaned_phone:
+            self._record(cleaned_phone, self._phone_set, self.phone_numbers, extracted["phone_numbers"])
+    
+    def _record_keyword(self, keyword: str, extracted: Dict[str, List[str]]) -> None:
+        """Store a matched scam keyword"""
+        if keyword not in self._keyword_set:
+            self._keyword_words.update(self._WORD_RE.findall(keyword))
+            self._record(keyword, self._keyword_set, self.suspicious_keywords, extracted["keywords"])
+    
+    def _match_keywords(self, message_lower: str) -> List[str]:
+        """Return the scam keywords present in a lowercased message"""
+        if self._keyword_automaton is not None:
+            return list(dict.fromkeys(
+                keyword for _, keyword in self._keyword_automaton.iter(message_lower)
+            ))
+        
+        return [keyword for keyword in self.scam_keywords if keyword in message_lower]
+    
     def _extract_pattern(self, text: str, pattern_name: str) -> List[str]:
         """Extract matches for a specific pattern"""
-        if pattern_name not in self.patterns:
+        pattern = self.patterns.get(pattern_name)
+        if pattern is None:
             return []
         
-        pattern = self.patterns[pattern_name]
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_matches = []
-        for match in matches:
-            if match not in seen:
-                seen.add(match)
-                unique_matches.append(match)
-        
-        return unique_matches
+        # Remove duplicates while preserving order, in a single pass
+        return list(dict.fromkeys(pattern.findall(text)))
     
     def _clean_phone_number(self, phone: str) -> str:
-        """Clean and validate phone number"""
-        # Remove spaces, dashes, parentheses
-        cleaned = re.sub(r'[\s\-\(\)]', '', phone)
+        """
+        Clean and validate a phone pattern match
         
-        # Must be 10-15 digits
-        if len(cleaned) < 10 or len(cleaned) > 15:
-            return ""
+        The pattern only admits an optional leading "+", digits and the
+        separators in _PHONE_DELETE, so after deletion only digits remain
+        and the length is the one thing left to check.
+        """
+        has_plus = phone.startswith('+')
         
-        # Must be all digits (possibly with leading +)
-        if cleaned.startswith('+'):
-            cleaned = cleaned[1:]
+        # Remove spaces, dashes, parentheses in one pass
+        cleaned = (phone[1:] if has_plus else phone).translate(self._PHONE_DELETE)
         
-        if not cleaned.isdigit():
+        # Must be 10-15 digits
+        if not 10 <= len(cleaned) <= 15:
             return ""
         
         # Add back + if it was there
-        if phone.strip().startswith('+'):
-            return '+' + cleaned
-        
-        return cleaned
+        return '+' + cleaned if has_plus else cleaned
     
     def analyze_url(self, url: str) -> Dict[str, any]:
         """Analyze a URL for suspicious characteristics"""
@@ -145,15 +358,15 @@ class IntelligenceExtractor:
         
         try:
             parsed = urlparse(url)
+            netloc_lower = parsed.netloc.lower()
             
             # Check for IP address instead of domain
-            if re.match(r'^\d+\.\d+\.\d+\.\d+$', parsed.netloc):
+            if self._IP_RE.match(parsed.netloc):
                 analysis["is_suspicious"] = True
                 analysis["indicators"].append("IP address instead of domain")
             
             # Check for suspicious TLDs
-            suspicious_tlds = ['.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top']
-            if any(parsed.netloc.endswith(tld) for tld in suspicious_tlds):
+            if "." + netloc_lower.rsplit(".", 1)[-1] in self._SUSPICIOUS_TLDS:
                 analysis["is_suspicious"] = True
                 analysis["indicators"].append("Suspicious TLD")
             
@@ -164,8 +377,7 @@ class IntelligenceExtractor:
                 analysis["indicators"].append("Excessive subdomains")
             
             # Check for suspicious keywords in domain
-            suspicious_words = ['verify', 'secure', 'account', 'update', 'confirm', 'banking']
-            if any(word in parsed.netloc.lower() for word in suspicious_words):
+            if self._has_suspicious_domain_word(netloc_lower):
                 analysis["is_suspicious"] = True
                 analysis["indicators"].append("Suspicious keywords in domain")
             
@@ -175,22 +387,30 @@ class IntelligenceExtractor:
         
         return analysis
     
-    def get_intelligence_summary(self) -> Dict[str, any]:
-        """Get a summary of all collected intelligence"""
-        return {
-            "bank_accounts": self.bank_accounts,
-            "upi_ids": self.upi_ids,
-            "phishing_links": self.phishing_links,
-            "phone_numbers": self.phone_numbers,
-            "suspicious_keywords": self.suspicious_keywords,
-            "total_indicators": (
-                len(self.bank_accounts) +
-                len(self.upi_ids) +
-                len(self.phishing_links) +
-                len(self.phone_numbers) +
-                len(self.suspicious_keywords)
+    def _has_suspicious_domain_word(self, netloc_lower: str) -> bool:
+        """Check a lowercased domain for phishing keywords"""
+        if self._domain_automaton is not None:
+            return next(self._domain_automaton.iter(netloc_lower), None) is not None
+        
+        return any(word in netloc_lower for word in self._SUSPICIOUS_DOMAIN_WORDS)
+    
+    def get_intelligence_summary(self) -> IntelligenceSummary:
+        """
+        Get a summary of all collected intelligence
+        
+        Use dataclasses.asdict() on the result if a dict is needed.
+        """
+        if self._summary is None:
+            self._summary = IntelligenceSummary(
+                bank_accounts=self.bank_accounts,
+                upi_ids=self.upi_ids,
+                phishing_links=self.phishing_links,
+                phone_numbers=self.phone_numbers,
+                suspicious_keywords=self.suspicious_keywords,
+                total_indicators=self._total
             )
-        }
+        
+        return self._summary
     
     def generate_summary(self) -> str:
         """Generate a human-readable summary of the intelligence"""
@@ -219,22 +439,9 @@ class IntelligenceExtractor:
     
     def get_scam_type(self) -> str:
         """Determine the type of scam based on collected intelligence"""
-        keywords_text = " ".join(self.suspicious_keywords).lower()
-        
-        if any(word in keywords_text for word in ["prize", "winner", "won", "lottery"]):
-            return "Prize/Lottery Scam"
-        
-        if any(word in keywords_text for word in ["bank", "account", "blocked", "suspended"]):
-            return "Bank Account Scam"
-        
-        if any(word in keywords_text for word in ["kyc", "update", "verify"]):
-            return "KYC/Verification Scam"
-        
-        if any(word in keywords_text for word in ["refund", "cashback"]):
-            return "Refund Scam"
-        
-        if any(word in keywords_text for word in ["legal", "arrest", "court"]):
-            return "Threat/Extortion Scam"
+        for scam_type, trigger_words in self._SCAM_TYPE_RULES:
+            if not trigger_words.isdisjoint(self._keyword_words):
+                return scam_type
         
         if self.phishing_links:
             return "Phishing Scam"
@@ -3,26 +3,26 @@ AI-Powered Agentic Honeypot for Scam Detection
 Main FastAPI application
 """
 
-from fastapi import FastAPI, HTTPException, Header, Request
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, BackgroundTasks, Depends
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any
 import uvicorn
 from datetime import datetime
 import logging
-import requests
+import asyncio
+import hmac
+import httpx
+import orjson
 import os
 
 from scam_detector import ScamDetector
 from ai_agent import HoneypotAgent
 from intelligence_extractor import IntelligenceExtractor
-from models import (
-    Message,
-    IncomingRequest,
-    AgentResponse,
-    ExtractedIntelligence,
-    FinalResultPayload
-)
+from session_store import create_session_store
+from models import IncomingRequest, AgentResponse
 
 # Configure logging
 logging.basicConfig(
@@ -31,127 +31,207 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class SampleFilter(logging.Filter):
+    """
+    Pass one in every `rate` records of each message (warnings and errors
+    always pass)
+    
+    Each log format string has its own counter, so lines logged once per
+    request are all kept on the same request instead of the sampled slot
+    always falling on the same line.
+    """
+    
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(rate, 1)
+        self._seen: Dict[str, int] = {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        
+        seen = self._seen.get(record.msg, 0)
+        self._seen[record.msg] = (seen + 1) % self.rate
+        return seen == 0
+
+
+# Per-request logs go through a sampled child logger to keep handler
+# cost flat under load
+request_logger = logging.getLogger(f"{__name__}.requests")
+request_logger.addFilter(SampleFilter(int(os.getenv("LOG_SAMPLE_RATE", 100))))
+
+
+# Second-resolution ISO timestamp shared by all requests, refreshed by _tick_clock
+_now_iso = datetime.now().isoformat(timespec="seconds")
+
+
+async def _tick_clock():
+    """Refresh the cached timestamp once a second"""
+    global _now_iso
+    while True:
+        _now_iso = datetime.now().isoformat(timespec="seconds")
+        await asyncio.sleep(1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the clock and pooled callback client; release shared clients on shutdown"""
+    clock = asyncio.create_task(_tick_clock())
+    app.state.http = httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+    )
+    yield
+    clock.cancel()
+    await app.state.http.aclose()
+    await sessions.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Agentic Honeypot API",
     description="AI-powered system for scam detection and intelligence extraction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Compress larger responses; level 5 keeps most of the ratio at far less CPU than 9
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configuration - Get from environment variables for cloud deployment
 API_KEY = os.getenv("API_KEY", "your-secret-api-key-here")  # Change default or set env var
 GUVI_CALLBACK_URL = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
+REDIS_URL = os.getenv("REDIS_URL")  # Share sessions across workers when set
+SESSION_TTL = int(os.getenv("SESSION_TTL", 3600))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 10000))  # In-memory store only
 
 # Log the API key being used (first 5 chars only for security)
-logger.info(f"API Key configured: {API_KEY[:5]}..." if len(API_KEY) > 5 else "API Key not set!")
+if len(API_KEY) > 5:
+    logger.info("API Key configured: %s...", API_KEY[:5])
+else:
+    logger.info("API Key not set!")
 
 # Initialize components
 scam_detector = ScamDetector()
 honeypot_agent = HoneypotAgent()
-intelligence_extractor = IntelligenceExtractor()
 
-# Session storage (in production, use Redis or database)
-sessions: Dict[str, Dict[str, Any]] = {}
+# Session storage (Redis when REDIS_URL is set, otherwise in-process)
+sessions = create_session_store(REDIS_URL, SESSION_TTL, MAX_SESSIONS)
+
 
+_API_KEY_BYTES = API_KEY.encode()
 
-def verify_api_key(x_api_key: str = Header(...)) -> bool:
-    """Verify API key from header"""
-    if x_api_key != API_KEY:
-        logger.warning(f"Invalid API key attempt: {x_api_key[:5]}...")
+
+async def verify_api_key(x_api_key: str = Header(...)) -> None:
+    """Verify API key from header (constant-time compare)"""
+    if not hmac.compare_digest(x_api_key.encode(), _API_KEY_BYTES):
+        logger.warning("Invalid API key attempt: %s...", x_api_key[:5])
         raise HTTPException(status_code=401, detail="Invalid API key")
-    return True
 
 
-@app.post("/api/message", response_model=AgentResponse)
+@app.post(
+    "/api/message",
+    response_model=AgentResponse,
+    dependencies=[Depends(verify_api_key)]
+)
 async def process_message(
     request: IncomingRequest,
-    x_api_key: str = Header(...)
+    background_tasks: BackgroundTasks
 ):
     """
     Main endpoint to process incoming messages
     Detects scam intent and engages with AI agent
     """
     try:
-        # Verify API key
-        verify_api_key(x_api_key)
-        
         session_id = request.sessionId
         current_message = request.message
         conversation_history = request.conversationHistory or []
         
-        logger.info(f"Processing message for session: {session_id}")
-        logger.info(f"Message from {current_message.sender}: {current_message.text}")
+        request_logger.info("Processing message for session: %s", session_id)
         
-        # Initialize or retrieve session
-        if session_id not in sessions:
-            sessions[session_id] = {
-                "messages": [],
-                "scam_detected": False,
-                "intelligence": IntelligenceExtractor(),
-                "engagement_count": 0,
-                "started_at": datetime.now().isoformat()
-            }
-        
-        session = sessions[session_id]
-        session["messages"].append(current_message.dict())
-        session["engagement_count"] += 1
-        
-        # Detect scam intent
-        full_conversation = conversation_history + [current_message]
-        is_scam, scam_confidence, scam_indicators = scam_detector.detect_scam(
+        # Detect scam intent (CPU-bound scans run off the event loop,
+        # before the session is loaded)
+        is_scam, scam_confidence, scam_indicators = await run_in_threadpool(
+            scam_detector.detect_scam,
             current_message.text,
             conversation_history
         )
         
-        logger.info(f"Scam detection - Is scam: {is_scam}, Confidence: {scam_confidence:.2f}")
+        request_logger.info(
+            "Scam detection - Is scam: %s, Confidence: %.2f",
+            is_scam, scam_confidence
+        )
         
-        if is_scam:
-            session["scam_detected"] = True
+        # Apply one request per session at a time, from load to save
+        async with sessions.lock(session_id):
+            # Initialize or retrieve session
+            session = await sessions.get(session_id)
+            if session is None:
+                session = {
+                    "messages": [],
+                    "scam_detected": False,
+                    "intelligence": IntelligenceExtractor(),
+                    "engagement_count": 0,
+                    "started_at": _now_iso
+                }
             
-            # Extract intelligence from current message
-            session["intelligence"].extract_from_message(current_message.text)
-            
-            # Generate AI agent response
-            agent_reply = honeypot_agent.generate_response(
-                current_message.text,
-                conversation_history,
-                scam_indicators,
-                session["engagement_count"]
-            )
-            
-            # Store agent response
-            agent_message = Message(
-                sender="user",
-                text=agent_reply,
-                timestamp=datetime.now().isoformat()
-            )
-            session["messages"].append(agent_message.dict())
-            
-            # Check if we should end conversation and send final result
-            should_end = honeypot_agent.should_end_conversation(
-                session["engagement_count"],
-                session["intelligence"]
-            )
-            
-            if should_end:
-                logger.info(f"Ending conversation for session {session_id}")
-                await send_final_result(session_id, session)
-            
-            return AgentResponse(
-                status="success",
-                reply=agent_reply
-            )
-        else:
-            # Not a scam - respond normally or politely disengage
-            reply = "I'm not sure I understand. Could you clarify?"
-            
-            return AgentResponse(
-                status="success",
-                reply=reply
-            )
+            session["messages"].append(current_message.model_dump())
+            session["engagement_count"] += 1
             
+            if is_scam:
+                session["scam_detected"] = True
+                
+                # Extract intelligence from current message (a few microseconds,
+                # so it stays on the loop while the session is held)
+                session["intelligence"].extract_from_message(current_message.text)
+                
+                # Generate AI agent response
+                agent_reply = honeypot_agent.generate_response(
+                    current_message.text,
+                    conversation_history,
+                    scam_indicators,
+                    session["engagement_count"]
+                )
+                
+                # Store agent response (already valid, so skip the model)
+                session["messages"].append({
+                    "sender": "user",
+                    "text": agent_reply,
+                    "timestamp": _now_iso
+                })
+                
+                # Check if we should end conversation and send final result
+                should_end = honeypot_agent.should_end_conversation(
+                    session["engagement_count"],
+                    session["intelligence"]
+                )
+                
+                await sessions.save(session_id, session)
+                
+                if should_end:
+                    logger.info("Ending conversation for session %s", session_id)
+                    # Report after the reply has been sent
+                    background_tasks.add_task(send_final_result, session_id, session)
+                
+                return AgentResponse(
+                    status="success",
+                    reply=agent_reply
+                )
+            else:
+                # Not a scam - respond normally or politely disengage
+                reply = "I'm not sure I understand. Could you clarify?"
+                
+                await sessions.save(session_id, session)
+                
+                return AgentResponse(
+                    status="success",
+                    reply=reply
+                )
+                
     except Exception as e:
-        logger.error(f"Error processing message: {str(e)}", exc_info=True)
+        logger.error("Error processing message: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
@@ -180,24 +260,27 @@ async def send_final_result(session_id: str, session: Dict[str, Any]):
             "agentNotes": intelligence.generate_summary()
         }
         
-        logger.info(f"Sending final result for session {session_id}")
-        logger.info(f"Payload: {payload}")
+        logger.info("Sending final result for session %s", session_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Payload: %s", payload)
         
         # Send to GUVI endpoint
-        response = requests.post(
+        response = await app.state.http.post(
             GUVI_CALLBACK_URL,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=10
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"}
         )
         
         if response.status_code == 200:
-            logger.info(f"Successfully sent final result for session {session_id}")
+            logger.info("Successfully sent final result for session %s", session_id)
         else:
-            logger.error(f"Failed to send final result: {response.status_code} - {response.text}")
+            logger.error(
+                "Failed to send final result: %s - %s",
+                response.status_code, response.text
+            )
             
     except Exception as e:
-        logger.error(f"Error sending final result: {str(e)}", exc_info=True)
+        logger.error("Error sending final result: %s", e, exc_info=True)
 
 
 @app.get("/health")
@@ -205,8 +288,8 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "active_sessions": len(sessions)
+        "timestamp": _now_iso,
+        "active_sessions": await sessions.count()
     }
 
 
@@ -221,19 +304,18 @@ async def root():
     }
 
 
-@app.get("/sessions/{session_id}")
-async def get_session(session_id: str, x_api_key: str = Header(...)):
+@app.get("/sessions/{session_id}", dependencies=[Depends(verify_api_key)])
+async def get_session(session_id: str):
     """Get session details (for debugging)"""
-    verify_api_key(x_api_key)
-    
-    if session_id not in sessions:
+    session = await sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
     return {
         "sessionId": session_id,
-        "scamDetected": sessions[session_id]["scam_detected"],
-        "messageCount": len(sessions[session_id]["messages"]),
-        "engagementCount": sessions[session_id]["engagement_count"]
+        "scamDetected": session["scam_detected"],
+        "messageCount": len(session["messages"]),
+        "engagementCount": session["engagement_count"]
     }
 
 
@@ -241,13 +323,26 @@ if __name__ == "__main__":
     # Get port from environment variable (for cloud platforms like Render, Heroku, Railway)
     port = int(os.getenv("PORT", 8000))
     
-    logger.info(f"Starting server on port {port}")
-    logger.info(f"API Key: {API_KEY[:5]}..." if len(API_KEY) > 5 else "No API key set!")
+    logger.info("Starting server on port %s", port)
+    if len(API_KEY) > 5:
+        logger.info("API Key: %s...", API_KEY[:5])
+    else:
+        logger.info("No API key set!")
+    
+    # Multiple workers need shared session state, so default to one
+    # worker per CPU only when sessions live in Redis
+    default_workers = (os.cpu_count() or 1) if REDIS_URL else 1
+    workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
     
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        limit_concurrency=1000,
+        timeout_keep_alive=30,
         reload=False,  # Disable reload in production
         log_level="info"
     )
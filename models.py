@@ -2,13 +2,15 @@
 Pydantic models for request/response validation
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict
 from datetime import datetime
 
 
 class Message(BaseModel):
     """Message model"""
+    model_config = ConfigDict(extra="ignore")
+    
     sender: str = Field(..., description="Sender of the message: 'scammer' or 'user'")
     text: str = Field(..., description="Message content")
     timestamp: str = Field(..., description="ISO-8601 timestamp")
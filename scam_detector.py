@@ -4,132 +4,192 @@ Uses pattern matching and heuristics to detect scam intent
 """
 
 import re
-from typing import List, Tuple, Dict
+from collections import Counter
+from typing import Any, Counter as CounterType, Dict, FrozenSet, List, Optional, Pattern, Tuple
 from models import Message
 
+try:
+    import ahocorasick  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - optional speedup
+    ahocorasick = None
+
+
+_WORD_RE = re.compile(r"\w+")
+
+# Shortest text that can reach the scam threshold (e.g. "pinow" with an
+# escalating history); anything shorter is skipped without scanning
+_MIN_SCORABLE_LENGTH = 5
+
+# (category, score per keyword, score cap, indicator label)
+CategoryScoring = Tuple[str, float, float, str]
+
 
 class ScamDetector:
     """Detects scam intent in messages"""
     
-    def __init__(self):
+    def __init__(self) -> None:
         # Common scam keywords and patterns
-        self.urgent_keywords = [
+        self.urgent_keywords: List[str] = [
             "urgent", "immediately", "now", "asap", "today",
             "expire", "expires", "expired", "suspend", "suspended",
             "block", "blocked", "freeze", "frozen"
         ]
         
-        self.financial_keywords = [
+        self.financial_keywords: List[str] = [
             "bank", "account", "credit card", "debit card", "atm",
             "upi", "payment", "transaction", "transfer", "money",
             "refund", "cashback", "reward", "prize", "lottery",
             "tax", "penalty", "fine", "charge"
         ]
         
-        self.verification_keywords = [
+        self.verification_keywords: List[str] = [
             "verify", "confirm", "update", "validate", "authenticate",
             "click", "link", "website", "login", "password",
             "otp", "cvv", "pin", "security code"
         ]
         
-        self.threat_keywords = [
+        self.threat_keywords: List[str] = [
             "arrest", "legal action", "police", "court", "lawsuit",
             "fraud", "investigation", "suspicious activity", "unauthorized"
         ]
         
-        self.reward_keywords = [
+        self.reward_keywords: List[str] = [
             "won", "winner", "congratulations", "prize", "reward",
             "free", "gift", "bonus", "cashback", "claim"
         ]
         
+        # Whole-word contact requests, with common inflections listed
+        self.contact_keywords: FrozenSet[str] = frozenset({
+            "call", "calls", "called", "calling", "callback",
+            "contact", "contacts", "contacted", "contacting",
+            "whatsapp"
+        })
+        
         # Regex patterns for sensitive information
-        self.patterns = {
+        self.patterns: Dict[str, str] = {
             "phone": r'\+?[\d\s\-\(\)]{10,}',
             "upi": r'[\w\.\-]+@[\w]+',
             "url": r'https?://[^\s]+|www\.[^\s]+',
             "bank_account": r'\b\d{9,18}\b',
             "amount": r'(?:Rs\.?|INR|₹)\s*[\d,]+(?:\.\d{2})?'
         }
+        self._compiled: Dict[str, Pattern[str]] = {name: re.compile(pattern) for name, pattern in self.patterns.items()}
+        
+        # Category -> (score per keyword, score cap, indicator label)
+        self._category_scoring: Tuple[CategoryScoring, ...] = (
+            ("urgent", 0.15, 0.3, "Urgent language"),
+            ("financial", 0.1, 0.2, "Financial context"),
+            ("verification", 0.15, 0.3, "Verification request"),
+            ("threat", 0.2, 0.4, "Threatening language"),
+            ("reward", 0.15, 0.3, "Reward/Prize mention")
+        )
+        
+        self._urgent_keywords: Tuple[str, ...] = tuple(self.urgent_keywords)
+        
+        self._keyword_categories: Dict[str, List[str]] = {
+            "urgent": self.urgent_keywords,
+            "financial": self.financial_keywords,
+            "verification": self.verification_keywords,
+            "threat": self.threat_keywords,
+            "reward": self.reward_keywords
+        }
+        
+        # One automaton over every category; each keyword maps to all
+        # categories that list it (e.g. "prize" is financial and reward)
+        self._automaton: Optional[Any] = None
+        if ahocorasick is not None:
+            categories_by_keyword: Dict[str, List[str]] = {}
+            for category, keywords in self._keyword_categories.items():
+                for keyword in keywords:
+                    categories_by_keyword.setdefault(keyword, []).append(category)
+            
+            self._automaton = ahocorasick.Automaton()
+            for keyword, categories in categories_by_keyword.items():
+                self._automaton.add_word(keyword, (keyword, tuple(categories)))
+            self._automaton.make_automaton()
     
     def detect_scam(
         self,
         message_text: str,
-        conversation_history: List[Message]
+        conversation_history: List[Message],
+        return_indicators: bool = True
     ) -> Tuple[bool, float, List[str]]:
         """
         Detect if a message is a scam
         
+        Args:
+            message_text: Current message text
+            conversation_history: Previous conversation
+            return_indicators: Build the indicator list; pass False when
+                only the score is needed and indicators come back empty
+        
         Returns:
             - is_scam: Boolean indicating if scam detected
             - confidence: Confidence score (0-1)
             - indicators: List of scam indicators found
         """
-        indicators = []
+        if len(message_text) < _MIN_SCORABLE_LENGTH:
+            return False, 0.0, []
+        
+        indicators: List[str] = []
         score = 0.0
         
         message_lower = message_text.lower()
+        keyword_counts = self._count_keywords(message_lower)
         
-        # Check for urgent language
-        urgent_count = sum(1 for kw in self.urgent_keywords if kw in message_lower)
-        if urgent_count > 0:
-            indicators.append(f"Urgent language ({urgent_count} keywords)")
-            score += min(urgent_count * 0.15, 0.3)
-        
-        # Check for financial keywords
-        financial_count = sum(1 for kw in self.financial_keywords if kw in message_lower)
-        if financial_count > 0:
-            indicators.append(f"Financial context ({financial_count} keywords)")
-            score += min(financial_count * 0.1, 0.2)
-        
-        # Check for verification requests
-        verification_count = sum(1 for kw in self.verification_keywords if kw in message_lower)
-        if verification_count > 0:
-            indicators.append(f"Verification request ({verification_count} keywords)")
-            score += min(verification_count * 0.15, 0.3)
-        
-        # Check for threats
-        threat_count = sum(1 for kw in self.threat_keywords if kw in message_lower)
-        if threat_count > 0:
-            indicators.append(f"Threatening language ({threat_count} keywords)")
-            score += min(threat_count * 0.2, 0.4)
-        
-        # Check for reward/prize scams
-        reward_count = sum(1 for kw in self.reward_keywords if kw in message_lower)
-        if reward_count > 0:
-            indicators.append(f"Reward/Prize mention ({reward_count} keywords)")
-            score += min(reward_count * 0.15, 0.3)
+        # Score each keyword category against its weight and cap
+        for category, weight, cap, label in self._category_scoring:
+            count = keyword_counts[category]
+            if count > 0:
+                score += min(count * weight, cap)
+                if return_indicators:
+                    indicators.append(f"{label} ({count} keywords)")
+        
+        urgent_count = keyword_counts["urgent"]
+        financial_count = keyword_counts["financial"]
+        verification_count = keyword_counts["verification"]
+        threat_count = keyword_counts["threat"]
         
         # Check for suspicious URLs
-        urls = re.findall(self.patterns["url"], message_text)
+        urls = self._compiled["url"].findall(message_text)
         if urls:
-            indicators.append(f"Contains URLs ({len(urls)})")
             score += min(len(urls) * 0.2, 0.4)
-        
-        # Check for phone numbers
-        phones = re.findall(self.patterns["phone"], message_text)
-        if phones and any(kw in message_lower for kw in ["call", "contact", "whatsapp"]):
-            indicators.append(f"Phone numbers with contact request")
+            if return_indicators:
+                indicators.append(f"Contains URLs ({len(urls)})")
+        
+        # Check for phone numbers (only relevant alongside a contact request)
+        if (
+            not self.contact_keywords.isdisjoint(_WORD_RE.findall(message_lower)) and
+            self._compiled["phone"].search(message_text)
+        ):
             score += 0.2
+            if return_indicators:
+                indicators.append("Phone numbers with contact request")
         
         # Check for combination patterns (highly suspicious)
         if urgent_count > 0 and financial_count > 0:
-            indicators.append("Urgent + Financial = High risk pattern")
             score += 0.3
+            if return_indicators:
+                indicators.append("Urgent + Financial = High risk pattern")
         
         if verification_count > 0 and urls:
-            indicators.append("Verification + URL = Phishing pattern")
             score += 0.4
+            if return_indicators:
+                indicators.append("Verification + URL = Phishing pattern")
         
         if threat_count > 0 and financial_count > 0:
-            indicators.append("Threat + Financial = Extortion pattern")
             score += 0.4
+            if return_indicators:
+                indicators.append("Threat + Financial = Extortion pattern")
         
-        # Analyze conversation history for escalation
-        if len(conversation_history) > 0:
-            escalation = self._detect_escalation(conversation_history, message_text)
+        # Analyze conversation history for escalation (not needed once
+        # the score has already reached the cap)
+        if score < 1.0 and len(conversation_history) > 0:
+            escalation = self._detect_escalation(conversation_history, urgent_count)
             if escalation:
-                indicators.append("Escalating pressure detected")
                 score += 0.2
+                if return_indicators:
+                    indicators.append("Escalating pressure detected")
         
         # Cap score at 1.0
         confidence = min(score, 1.0)
@@ -139,40 +199,53 @@ class ScamDetector:
         
         return is_scam, confidence, indicators
     
+    def _count_keywords(self, message_lower: str) -> CounterType[str]:
+        """Count the distinct keywords of each category present in a message"""
+        if self._automaton is None:
+            return Counter({
+                category: sum(1 for kw in keywords if kw in message_lower)
+                for category, keywords in self._keyword_categories.items()
+            })
+        
+        matched = {value for _, value in self._automaton.iter(message_lower)}
+        return Counter(
+            category for _, categories in matched for category in categories
+        )
+    
     def _detect_escalation(
         self,
         conversation_history: List[Message],
-        current_message: str
+        current_urgent: int
     ) -> bool:
-        """Detect if scammer is escalating pressure"""
+        """
+        Detect if scammer is escalating pressure
+        
+        Args:
+            conversation_history: Previous conversation
+            current_urgent: Urgent keyword count of the current message,
+                as already computed by detect_scam
+        """
         if len(conversation_history) < 2:
             return False
         
-        # Count urgent keywords in recent messages
-        recent_messages = conversation_history[-3:]
-        urgent_counts = []
-        
-        for msg in recent_messages:
+        # Escalation if urgent language has grown since the earliest recent
+        # scammer message; later ones never affect the comparison
+        for msg in conversation_history[-3:]:
             if msg.sender == "scammer":
-                count = sum(1 for kw in self.urgent_keywords if kw in msg.text.lower())
-                urgent_counts.append(count)
-        
-        # Check current message
-        current_urgent = sum(1 for kw in self.urgent_keywords if kw in current_message.lower())
-        urgent_counts.append(current_urgent)
-        
-        # Escalation if urgent language is increasing
-        if len(urgent_counts) >= 2:
-            return urgent_counts[-1] > urgent_counts[0]
+                return current_urgent > self._count_urgent(msg.text.lower())
         
         return False
     
+    def _count_urgent(self, message_lower: str) -> int:
+        """Count urgent keywords only (cheaper than a full category count)"""
+        return len([kw for kw in self._urgent_keywords if kw in message_lower])
+    
     def extract_patterns(self, text: str) -> Dict[str, List[str]]:
         """Extract various patterns from text"""
-        results = {}
+        results: Dict[str, List[str]] = {}
         
-        for pattern_name, pattern in self.patterns.items():
-            matches = re.findall(pattern, text)
+        for pattern_name, pattern in self._compiled.items():
+            matches = pattern.findall(text)
             results[pattern_name] = list(set(matches))  # Remove duplicates
         
         return results
@@ -0,0 +1,178 @@
+"""
+Session Storage Module
+Keeps per-conversation state in process memory or in Redis
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+import orjson
+import redis.asyncio as aioredis
+
+from intelligence_extractor import IntelligenceExtractor
+
+
+Session = Dict[str, Any]
+
+
+def _dump_session(session: Session) -> bytes:
+    """Encode a session as JSON, storing the extractor as its collected lists"""
+    data = dict(session)
+    data["intelligence"] = session["intelligence"].to_dict()
+    return orjson.dumps(data)
+
+
+def _load_session(data: Union[bytes, str]) -> Session:
+    """Decode a session stored by _dump_session"""
+    session: Session = orjson.loads(data)
+    session["intelligence"] = IntelligenceExtractor.from_dict(session["intelligence"])
+    return session
+
+
+class InMemorySessionStore:
+    """
+    Stores sessions in a local dict (single worker only)
+    
+    Sessions expire `ttl` seconds after their last save, and once
+    `max_sessions` are held the one saved longest ago is evicted, so
+    memory stays bounded however many session IDs clients send. Only
+    saves reorder entries, which keeps them sorted by expiry.
+    """
+    
+    def __init__(self, ttl: int = 3600, max_sessions: int = 10000):
+        # session_id -> (expiry on the monotonic clock, session), soonest first
+        self._sessions: "OrderedDict[str, Tuple[float, Session]]" = OrderedDict()
+        self._ttl = ttl
+        self._max_sessions = max_sessions
+        
+        # Per-session locks, dropped once no request holds or awaits them
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+    
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        """Serialize requests for one session from load to save"""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        self._lock_users[session_id] = self._lock_users.get(session_id, 0) + 1
+        
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[session_id] -= 1
+            if self._lock_users[session_id] == 0:
+                del self._lock_users[session_id]
+                del self._locks[session_id]
+    
+    async def get(self, session_id: str) -> Optional[Session]:
+        """Get a session, or None if it does not exist or has expired"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        
+        expires_at, session = entry
+        if expires_at <= time.monotonic():
+            del self._sessions[session_id]
+            return None
+        
+        return session
+    
+    async def save(self, session_id: str, session: Session) -> None:
+        """Create or update a session and refresh its TTL"""
+        now = time.monotonic()
+        self._sessions[session_id] = (now + self._ttl, session)
+        self._sessions.move_to_end(session_id)
+        
+        self._evict_expired(now)
+        while len(self._sessions) > self._max_sessions:
+            self._sessions.popitem(last=False)
+    
+    async def count(self) -> int:
+        """Number of live sessions"""
+        self._evict_expired(time.monotonic())
+        return len(self._sessions)
+    
+    def _evict_expired(self, now: float) -> None:
+        """Drop expired sessions from the soonest-to-expire end"""
+        while self._sessions:
+            expires_at, _ = next(iter(self._sessions.values()))
+            if expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+    
+    async def close(self) -> None:
+        """Release resources held by the store"""
+
+
+class RedisSessionStore:
+    """
+    Stores sessions in Redis so every worker sees the same state
+    
+    Each session is one JSON value that expires after `ttl` seconds
+    without activity, so loading and saving cost a GET and a SET. A sorted
+    set of session IDs scored by expiry time lets `count` answer without
+    scanning the keyspace. Callers hold `lock` from load to save; it is a
+    Redis lock, so two workers serving one session cannot overwrite each
+    other's updates.
+    """
+    
+    KEY_PREFIX = "sess:"
+    LOCK_PREFIX = "lock:sess:"
+    LIVE_KEY = "sessions:live"
+    LOCK_TIMEOUT = 30
+    
+    def __init__(self, url: str, ttl: int = 3600):
+        self._redis = aioredis.from_url(url)
+        self._ttl = ttl
+    
+    def lock(self, session_id: str) -> Any:
+        """Serialize requests for one session across all workers"""
+        return self._redis.lock(
+            self.LOCK_PREFIX + session_id,
+            timeout=self.LOCK_TIMEOUT,
+            blocking_timeout=self.LOCK_TIMEOUT
+        )
+    
+    async def get(self, session_id: str) -> Optional[Session]:
+        """Get a session, or None if it does not exist or has expired"""
+        data = await self._redis.get(self.KEY_PREFIX + session_id)
+        if data is None:
+            return None
+        
+        return _load_session(data)
+    
+    async def save(self, session_id: str, session: Session) -> None:
+        """Create or update a session and refresh its TTL"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self.KEY_PREFIX + session_id, _dump_session(session), ex=self._ttl)
+            pipe.zadd(self.LIVE_KEY, {session_id: time.time() + self._ttl})
+            await pipe.execute()
+    
+    async def count(self) -> int:
+        """Number of live sessions"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.LIVE_KEY, "-inf", time.time())
+            pipe.zcard(self.LIVE_KEY)
+            _, count = await pipe.execute()
+        return int(count)
+    
+    async def close(self) -> None:
+        """Close the Redis connection pool"""
+        await self._redis.aclose()
+
+
+def create_session_store(
+    redis_url: Optional[str] = None,
+    ttl: int = 3600,
+    max_sessions: int = 10000
+):
+    """Use Redis when a URL is configured, otherwise keep sessions in memory"""
+    if redis_url:
+        return RedisSessionStore(redis_url, ttl)
+    
+    return InMemorySessionStore(ttl, max_sessions)